@@ -31,7 +31,7 @@ class BatchManager(object):
 
     def process_batch(self, obj_list, qb=None):
         if not qb:
-            qb = QuickBooks()
+            qb = QuickBooks.get_shared()
 
         batch = self.list_to_batch_request(obj_list)
         json_data = qb.batch_operation(batch.to_json())
@@ -6,7 +6,7 @@ from .helpers import qb_datetime_format
 
 def change_data_capture(qbo_class_list, timestamp, qb=None):
     if qb is None:
-        qb = QuickBooks()
+        qb = QuickBooks.get_shared()
 
     cdc_class_dict = dict((cls.qbo_object_name, cls) for cls in qbo_class_list)
 
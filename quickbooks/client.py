@@ -1,19 +1,144 @@
+import contextlib
 import http.client as httplib
-import textwrap
+import io
 import json
 import base64
 import hashlib
 import hmac
 import decimal
+import time
 import warnings
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 from . import exceptions
+from .ratelimit import get_bucket
+from requests.adapters import HTTPAdapter
 from requests_oauthlib import OAuth2Session
+from urllib3.fields import format_multipart_header_param
+from urllib3.util.retry import Retry
 
 def to_bytes(value, *args, **kwargs):
     return bytes(value, "utf-8", *args, **kwargs)
 
 
+class Base64Stream(object):
+    """
+    Reads a binary file object as base64, encoding it a chunk at a time
+    """
+    # a multiple of 3, so chunks encode without padding and join into valid base64
+    CHUNK_SIZE = 3 * 64 * 1024
+
+    def __init__(self, raw):
+        self._raw = raw
+        self._start = raw.tell()
+        self._buffer = b''
+
+        size = raw.seek(0, io.SEEK_END) - self._start
+        raw.seek(self._start)
+        self.length = 4 * ((size + 2) // 3)
+
+    def _read_chunk(self):
+        chunk = self._raw.read(self.CHUNK_SIZE)
+
+        # short reads must still end on a multiple of 3 unless the file is done
+        while chunk and len(chunk) % 3:
+            more = self._raw.read(3 - len(chunk) % 3)
+            if not more:
+                break
+            chunk += more
+
+        return base64.b64encode(chunk)
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            encoded = self._read_chunk()
+            if not encoded:
+                break
+            self._buffer += encoded
+
+        if size < 0:
+            size = len(self._buffer)
+
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def rewind(self):
+        self._raw.seek(self._start)
+        self._buffer = b''
+
+
+class MultipartStream(object):
+    """
+    multipart/form-data body for attachment uploads. The file content is read and
+    base64 encoded in chunks as requests sends the body, and len() lets requests set
+    Content-Length.
+    """
+    def __init__(self, boundary, metadata, attachment):
+        metadata_json = json.loads(metadata)
+
+        filename = ''
+        if metadata_json.get('FileName'):
+            filename = '; ' + format_multipart_header_param('filename', metadata_json['FileName'])
+
+        head = (
+            '--{0}\r\n'
+            'Content-Disposition: form-data; name="file_metadata_01"\r\n'
+            'Content-Type: application/json\r\n\r\n'
+            '{1}\r\n'
+            '--{0}\r\n'
+            'Content-Disposition: form-data; name="file_content_01"{2}\r\n'
+            'Content-Type: {3}\r\n'
+            'Content-Transfer-Encoding: base64\r\n\r\n'
+        ).format(boundary, metadata, filename, metadata_json['ContentType']).encode('utf-8')
+        tail = '\r\n--{0}--\r\n'.format(boundary).encode('utf-8')
+
+        self._content = Base64Stream(attachment)
+        self._parts = [io.BytesIO(head), self._content, io.BytesIO(tail)]
+        self._length = len(head) + self._content.length + len(tail)
+        self._index = 0
+        self._position = 0
+
+    def __len__(self):
+        return self._length - self._position
+
+    def read(self, size=-1):
+        chunks = []
+
+        while self._index < len(self._parts) and size != 0:
+            chunk = self._parts[self._index].read(size)
+
+            if not chunk:
+                self._index += 1
+                continue
+
+            chunks.append(chunk)
+            if size > 0:
+                size -= len(chunk)
+
+        data = b''.join(chunks)
+        self._position += len(data)
+        return data
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """
+        Only rewinding to the start is supported, so the body can be resent
+        """
+        if offset != 0 or whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("MultipartStream can only be rewound")
+
+        self._parts[0].seek(0)
+        self._content.rewind()
+        self._parts[2].seek(0)
+
+        self._index = 0
+        self._position = 0
+        return 0
+
+
 class Environments(object):
     SANDBOX = 'sandbox'
     PRODUCTION = 'production'
@@ -21,6 +146,10 @@ class Environments(object):
 
 class QuickBooks(object):
     MINIMUM_MINOR_VERSION = 75
+    POOL_CONNECTIONS = 10
+    POOL_MAXSIZE = 10
+    MAX_RETRIES = 3
+    MAX_RETRY_AFTER = 60
     company_id = 0
     session = None
     auth_client = None
@@ -29,6 +158,9 @@ class QuickBooks(object):
     verifier_token = None
     invoice_link = False
     use_decimal = False
+    # Accounting API limit is 500 requests per minute per realm, set to None to disable
+    rate_limit = 500
+    rate_limit_period = 60
 
     sandbox_api_url_v3 = "https://sandbox-quickbooks.api.intuit.com/v3"
     api_url_v3 = "https://quickbooks.api.intuit.com/v3"
@@ -47,6 +179,7 @@ class QuickBooks(object):
 
     __instance = None
     __use_global = False
+    __shared = None
 
     def __new__(cls, **kwargs):
         """
@@ -98,8 +231,43 @@ class QuickBooks(object):
         if 'use_decimal' in kwargs:
             instance.use_decimal = kwargs.get('use_decimal')
 
+        if 'rate_limit' in kwargs:
+            instance.rate_limit = kwargs.get('rate_limit')
+
         return instance
 
+    @classmethod
+    def get_shared(cls):
+        """
+        Returns a process-wide client, used by the object mixins when no qb is passed in.
+        If the global client is enabled and set up this is the global instance.
+        """
+        if QuickBooks.__use_global and QuickBooks.__instance is not None:
+            return QuickBooks.__instance
+
+        if QuickBooks.__shared is None:
+            QuickBooks.__shared = cls(minorversion=cls.MINIMUM_MINOR_VERSION)
+
+        return QuickBooks.__shared
+
+    def _build_adapter(self):
+        """
+        Connection pool shared by all requests made with the session. Connection errors
+        are retried, as are idempotent requests that fail with a server error. Throttled
+        (429) responses are left to process_request so every attempt is rate limited.
+        """
+        retry = Retry(
+            total=self.MAX_RETRIES,
+            backoff_factor=0.5,
+            status_forcelist=[500, 502, 503, 504],
+            # otherwise urllib3 retries any 429 carrying a Retry-After header itself
+            respect_retry_after_header=False,
+            raise_on_status=False,
+        )
+
+        return HTTPAdapter(
+            pool_connections=self.POOL_CONNECTIONS, pool_maxsize=self.POOL_MAXSIZE, max_retries=retry)
+
     def _start_session(self):
         if self.auth_client.access_token is None:
             self.auth_client.refresh(refresh_token=self.refresh_token)
@@ -111,11 +279,13 @@ class QuickBooks(object):
                 'refresh_token': self.auth_client.refresh_token,
             }
         )
+        self.session.mount('https://', self._build_adapter())
 
         return self.auth_client.refresh_token
 
     def _drop(self):
         QuickBooks.__instance = None
+        QuickBooks.__shared = None
 
     @property
     def api_url(self):
@@ -124,6 +294,14 @@ class QuickBooks(object):
         else:
             return self.api_url_v3
 
+    @property
+    def company_url(self):
+        """
+        Base url for the company endpoints. Not cached, since sandbox and
+        company_id can be changed after the client is created.
+        """
+        return "{0}/company/{1}".format(self.api_url, self.company_id)
+
     def validate_webhook_signature(self, request_body, signature, verifier_token=None):
         hmac_verifier_token_hash = hmac.new(
             to_bytes(verifier_token or self.verifier_token),
@@ -144,12 +322,12 @@ class QuickBooks(object):
         if qs is None:
             qs = {}
 
-        url = self.api_url + "/company/{0}/reports/{1}".format(self.company_id, report_type)
+        url = "{0}/reports/{1}".format(self.company_url, report_type)
         result = self.get(url, params=qs)
         return result
 
     def change_data_capture(self, entity_string, changed_since):
-        url = "{0}/company/{1}/cdc".format(self.api_url, self.company_id)
+        url = "{0}/cdc".format(self.company_url)
 
         params = {"entities": entity_string, "changedSince": changed_since}
 
@@ -176,58 +354,34 @@ class QuickBooks(object):
             'User-Agent': 'python-quickbooks V3 library'
         }
 
-        if file_path or file_bytes:
-            url = url.replace('attachable', 'upload')
-            boundary = '-------------PythonMultipartPost'
-            headers.update({
-                'Content-Type': 'multipart/form-data; boundary=%s' % boundary,
-                'Accept-Encoding': 'gzip;q=1.0,deflate;q=0.6,identity;q=0.3',
-                'User-Agent': 'python-quickbooks V3 library',
-                'Accept': 'application/json',
-                'Connection': 'close'
-            })
-
-            if file_path:
-                with open(file_path, 'rb') as attachment:
-                    binary_data = str(base64.b64encode(attachment.read()).decode('ascii'))
-            else:
-                binary_data = str(base64.b64encode(file_bytes).decode('ascii'))
-
-            content_type = json.loads(request_body)['ContentType']
-
-            request_body = textwrap.dedent(
-                """
-                --%s
-                Content-Disposition: form-data; name="file_metadata_01"
-                Content-Type: application/json
-
-                %s
-
-                --%s
-                Content-Disposition: form-data; name="file_content_01"
-                Content-Type: %s
-                Content-Transfer-Encoding: base64
-
-                %s
+        with contextlib.ExitStack() as stack:
+            if file_path or file_bytes:
+                url = url.replace('attachable', 'upload')
+                boundary = '-------------PythonMultipartPost'
+                headers.update({
+                    'Content-Type': 'multipart/form-data; boundary=%s' % boundary,
+                    'Accept-Encoding': 'gzip;q=1.0,deflate;q=0.6,identity;q=0.3',
+                    'User-Agent': 'python-quickbooks V3 library',
+                    'Accept': 'application/json',
+                    'Connection': 'close'
+                })
 
-                --%s--
-                """
-            ) % (boundary, request_body, boundary, content_type, binary_data, boundary)
+                # The attachment is streamed from disk while the request is sent, not read up front
+                if file_path:
+                    attachment = stack.enter_context(open(file_path, 'rb'))
+                else:
+                    attachment = io.BytesIO(file_bytes)
 
-            # make sure request_body is not unicode (python 2 case)
-            request_body = str(request_body)
+                request_body = MultipartStream(boundary, request_body, attachment)
 
-        req = self.process_request(request_type, url, headers=headers, params=params, data=request_body)
+            req = self.process_request(request_type, url, headers=headers, params=params, data=request_body)
 
         if req.status_code == httplib.UNAUTHORIZED:
             raise exceptions.AuthorizationException(
                 "Application authentication failed", error_code=req.status_code, detail=req.text)
 
         try:
-            if (self.use_decimal):
-                result = json.loads(req.text, parse_float=decimal.Decimal)
-            else:
-                result = json.loads(req.text)
+            result = self._loads(req.text)
         except:
             raise exceptions.QuickbooksException("Error reading json response: {0}".format(req.text), 10000)
 
@@ -239,6 +393,18 @@ class QuickBooks(object):
         else:
             return result
 
+    def _loads(self, text):
+        """
+        Parses a response body. With use_decimal, floats are parsed straight to Decimal
+        so amounts never pass through float; otherwise orjson is used when installed.
+        """
+        if self.use_decimal:
+            return json.loads(text, parse_float=decimal.Decimal)
+        elif orjson is not None:
+            return orjson.loads(text)
+        else:
+            return json.loads(text)
+
     def get(self, *args, **kwargs):
         if 'params' not in kwargs:
             kwargs['params'] = {}
@@ -257,11 +423,42 @@ class QuickBooks(object):
 
         headers.update({'Authorization': 'Bearer ' + self.session.access_token})
 
-        return self.session.request(
-            request_type, url, headers=headers, params=params, data=data)
+        attempt = 0
+        while True:
+            if self.rate_limit:
+                get_bucket(self.company_id, self.rate_limit, self.rate_limit_period).consume()
+
+            response = self.session.request(
+                request_type, url, headers=headers, params=params, data=data)
+
+            # Throttled requests were not processed, so they are safe to resend (including POSTs)
+            if response.status_code != httplib.TOO_MANY_REQUESTS or attempt >= self.MAX_RETRIES:
+                return response
+
+            time.sleep(self._retry_after(response, attempt))
+            attempt += 1
+
+            if hasattr(data, 'seek'):
+                data.seek(0)
+
+    @classmethod
+    def _retry_after(cls, response, attempt):
+        """
+        Seconds to wait before resending a throttled request, from the Retry-After header
+        clamped to [0, MAX_RETRY_AFTER], or an exponential backoff if it is missing or invalid
+        """
+        try:
+            delay = float(response.headers['Retry-After'])
+        except (KeyError, TypeError, ValueError):
+            delay = float('nan')
+
+        if delay != delay:  # missing, unparseable or NaN
+            delay = 0.5 * 2 ** attempt
+
+        return min(max(delay, 0), cls.MAX_RETRY_AFTER)
 
     def get_single_object(self, qbbo, pk, params=None):
-        url = "{0}/company/{1}/{2}/{3}".format(self.api_url, self.company_id, qbbo.lower(), pk)
+        url = "{0}/{1}/{2}".format(self.company_url, qbbo.lower(), pk)
         if params is None:
             params = {}
 
@@ -304,13 +501,13 @@ class QuickBooks(object):
     def create_object(self, qbbo, request_body, _file_path=None, _file_bytes=None, request_id=None, params=None):
         self.isvalid_object_name(qbbo)
 
-        url = "{0}/company/{1}/{2}".format(self.api_url, self.company_id, qbbo.lower())
+        url = "{0}/{1}".format(self.company_url, qbbo.lower())
         results = self.post(url, request_body, file_path=_file_path, file_bytes=_file_bytes, request_id=request_id, params=params)
 
         return results
 
     def query(self, select, params=None):
-        url = "{0}/company/{1}/query".format(self.api_url, self.company_id)
+        url = "{0}/query".format(self.company_url)
         result = self.post(url, select, content_type='application/text', params=params)
 
         return result
@@ -322,7 +519,7 @@ class QuickBooks(object):
         return True
 
     def update_object(self, qbbo, request_body, _file_path=None, _file_bytes=None, request_id=None, params=None):
-        url = "{0}/company/{1}/{2}".format(self.api_url, self.company_id,  qbbo.lower())
+        url = "{0}/{1}".format(self.company_url, qbbo.lower())
         if params is None:
             params = {}
 
@@ -331,19 +528,19 @@ class QuickBooks(object):
         return result
 
     def delete_object(self, qbbo, request_body, _file_path=None, request_id=None):
-        url = "{0}/company/{1}/{2}".format(self.api_url, self.company_id, qbbo.lower())
+        url = "{0}/{1}".format(self.company_url, qbbo.lower())
         result = self.post(url, request_body, params={'operation': 'delete'}, file_path=_file_path, request_id=request_id)
 
         return result
 
     def batch_operation(self, request_body):
-        url = "{0}/company/{1}/batch".format(self.api_url, self.company_id)
+        url = "{0}/batch".format(self.company_url)
         results = self.post(url, request_body)
 
         return results
 
     def misc_operation(self, end_point, request_body, content_type='application/json'):
-        url = "{0}/company/{1}/{2}".format(self.api_url, self.company_id, end_point)
+        url = "{0}/{1}".format(self.company_url, end_point)
         results = self.post(url, request_body, content_type)
 
         return results
@@ -352,8 +549,7 @@ class QuickBooks(object):
         if self.session is None:
             raise exceptions.QuickbooksException('No session')
 
-        url = "{0}/company/{1}/{2}/{3}/pdf".format(
-            self.api_url, self.company_id, qbbo.lower(), item_id)
+        url = "{0}/{1}/{2}/pdf".format(self.company_url, qbbo.lower(), item_id)
 
         headers = {
             'Content-Type': 'application/pdf',
@@ -1,7 +1,16 @@
+import asyncio
 import decimal
+import functools
 import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import quote
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 from .client import QuickBooks
 from .exceptions import QuickbooksException
 from .utils import build_choose_clause, build_where_clause
@@ -12,76 +21,208 @@ class DecimalEncoder(json.JSONEncoder):
             return str(o)
         return super(DecimalEncoder, self).default(o)
 
-class ToJsonMixin(object):
-    def to_json(self):
-        return json.dumps(self, cls=DecimalEncoder, default=self.json_filter(), sort_keys=True, indent=4)
 
-    def json_filter(self):
+def _qb_json_default(obj):
+    """
+    filter out properties that have names starting with _
+    or properties that have a value of None
+    """
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    return {k: v for k, v in obj.__dict__.items() if v is not None and not k.startswith('_')}
+
+
+# Encoders are reused between calls, keyed by (sort_keys, indent)
+_ENCODERS = {}
+
+
+def _get_encoder(sort_keys, indent):
+    key = (sort_keys, bool(indent))
+    encoder = _ENCODERS.get(key)
+
+    if encoder is None:
+        # same output as orjson: compact separators unless indenting, non-ASCII left as is
+        encoder = _ENCODERS[key] = DecimalEncoder(
+            default=_qb_json_default, sort_keys=sort_keys, ensure_ascii=False,
+            indent=2 if indent else None, separators=None if indent else (',', ':'))
+
+    return encoder
+
+
+def dumps(obj, sort_keys=False, indent=None):
+    """
+    Serializes obj to a JSON string, using orjson when it is installed and
+    falling back to the stdlib json module (with DecimalEncoder) otherwise.
+    orjson only supports 2 space indentation, so the fallback uses the same.
+    """
+    if orjson is not None:
+        option = 0
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_qb_json_default, option=option).decode('utf-8')
+
+    return _get_encoder(sort_keys, indent).encode(obj)
+
+
+async def _run_in_executor(func, *args, **kwargs):
+    """
+    Runs a blocking client call in the event loop's default executor, so the loop
+    keeps serving other tasks while the request is in flight
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+class ToJsonMixin(object):
+    def to_json(self, pretty=False):
         """
-        filter out properties that have names starting with _
-        or properties that have a value of None
+        :param pretty: indent the output, for logging or display. API payloads are sent compact.
+        :return: JSON string
         """
-        return lambda obj: str(obj) if isinstance(obj, decimal.Decimal) else dict((k, v) for k, v in obj.__dict__.items()
-                                if not k.startswith('_') and getattr(obj, k) is not None)
+        return dumps(self, sort_keys=True, indent=pretty)
+
+
+def _list_from_json(sub_cls, detail_dict):
+    default = sub_cls.from_json
+    if not detail_dict:
+        return lambda value: [default(data) for data in value]
+
+    # DetailType -> parser, resolved once per class rather than per line
+    resolve = {detail_type: detail_cls.from_json for detail_type, detail_cls in detail_dict.items()}.get
+    return lambda value: [resolve(data.get('DetailType'), default)(data) for data in value]
+
+
+def _from_json_converters(class_dict, list_dict, detail_dict):
+    """
+    Maps each key with a sub object to the function converting its json value
+    """
+    converters = {}
+    for key, sub_cls in list_dict.items():
+        converters[key] = _list_from_json(sub_cls, detail_dict)
+
+    # class_dict takes precedence over list_dict
+    for key, sub_cls in class_dict.items():
+        converters[key] = sub_cls.from_json
+
+    return converters
 
 
 class FromJsonMixin(object):
     class_dict = {}
     list_dict = {}
+    _from_json_converters = None
+
+    def __init_subclass__(cls, **kwargs):
+        super(FromJsonMixin, cls).__init_subclass__(**kwargs)
+        # The dicts are fixed per class, so resolve them once instead of on every key parsed
+        cls._from_json_converters = _from_json_converters(
+            cls.class_dict, cls.list_dict, getattr(cls, 'detail_dict', {}))
 
     @classmethod
     def from_json(cls, json_data):
         obj = cls()
-        for key in json_data:
-            if key in obj.class_dict:
-                sub_obj = obj.class_dict[key]()
-                sub_obj = sub_obj.from_json(json_data[key])
-                setattr(obj, key, sub_obj)
+        converters = cls._from_json_converters
 
-            elif key in obj.list_dict:
-                sub_list = []
+        # class_dict/list_dict can be overridden per instance (see BatchItemResponse)
+        if converters is None or 'class_dict' in obj.__dict__ or 'list_dict' in obj.__dict__:
+            converters = _from_json_converters(obj.class_dict, obj.list_dict, getattr(obj, 'detail_dict', {}))
 
-                for data in json_data[key]:
+        for key, value in json_data.items():
+            convert = converters.get(key)
+            setattr(obj, key, value if convert is None else convert(value))
 
-                    if 'DetailType' in data and data['DetailType'] in obj.detail_dict:
-                        sub_obj = obj.detail_dict[data['DetailType']]()
-                    else:
-                        sub_obj = obj.list_dict[key]()
+        return obj
 
-                    sub_obj = sub_obj.from_json(data)
-                    sub_list.append(sub_obj)
 
-                setattr(obj, key, sub_list)
-            else:
-                setattr(obj, key, json_data[key])
+# Based on http://stackoverflow.com/a/1118038
+def _to_dict_scalar(node, classkey, stack):
+    return node
+
+
+def _to_dict_dict(node, classkey, stack):
+    data = {}
+    for k, v in node.items():
+        data[k] = v
+        stack.append((data, k))
+    return data
+
+
+def _to_dict_list(node, classkey, stack):
+    data = list(node)
+    for i in range(len(data)):
+        stack.append((data, i))
+    return data
+
+
+def _to_dict_ast(node, classkey, stack):
+    # the _ast() result is converted without classkey, as the recursive version did
+    return to_dict(node._ast())
+
+
+def _to_dict_object(node, classkey, stack):
+    attrs = getattr(node, "__dict__", None)
+    if attrs is None:
+        return node
+
+    data = {}
+    for k, v in attrs.items():
+        if not k.startswith('_') and not callable(v):
+            data[k] = v
+            stack.append((data, k))
+
+    if classkey is not None:
+        data[classkey] = node.__class__.__name__
+    return data
+
+
+_TO_DICT_DISPATCH = {
+    str: _to_dict_scalar,
+    int: _to_dict_scalar,
+    float: _to_dict_scalar,
+    bool: _to_dict_scalar,
+    type(None): _to_dict_scalar,
+    decimal.Decimal: _to_dict_scalar,
+    dict: _to_dict_dict,
+    list: _to_dict_list,
+    tuple: _to_dict_list,
+}
+
+
+def _to_dict_handler(node_type):
+    if issubclass(node_type, dict):
+        handler = _to_dict_dict
+    elif hasattr(node_type, "_ast"):
+        handler = _to_dict_ast
+    elif issubclass(node_type, str):
+        handler = _to_dict_scalar
+    elif hasattr(node_type, "__iter__"):
+        handler = _to_dict_list
+    else:
+        handler = _to_dict_object
 
-        return obj
+    _TO_DICT_DISPATCH[node_type] = handler
+    return handler
 
 
-# Based on http://stackoverflow.com/a/1118038
 def to_dict(obj, classkey=None):
     """
-    Recursively converts Python object into a dictionary
+    Converts Python object into a dictionary. Nested values are walked with an
+    explicit stack of (container, key) slots which are overwritten in place.
     """
-    if isinstance(obj, dict):
-        data = {}
-        for (k, v) in obj.items():
-            data[k] = to_dict(v, classkey)
-        return data
-    elif hasattr(obj, "_ast"):
-        return to_dict(obj._ast())
-    elif hasattr(obj, "__iter__") and not isinstance(obj, str):
-        return [to_dict(v, classkey) for v in obj]
-    elif hasattr(obj, "__dict__"):
-        data = dict([(key, to_dict(value, classkey))
-                    for key, value in obj.__dict__.items()
-                    if not callable(value) and not key.startswith('_')])
-
-        if classkey is not None and hasattr(obj, "__class__"):
-            data[classkey] = obj.__class__.__name__
-        return data
-    else:
-        return obj
+    dispatch = _TO_DICT_DISPATCH
+    stack = []
+    root = {None: obj}
+    stack.append((root, None))
+
+    while stack:
+        container, key = stack.pop()
+        node = container[key]
+        handler = dispatch.get(type(node)) or _to_dict_handler(type(node))
+        container[key] = handler(node, classkey, stack)
+
+    return root[None]
 
 
 class ToDictMixin(object):
@@ -96,7 +237,7 @@ class ReadMixin(object):
     @classmethod
     def get(cls, id, qb=None, params=None):
         if not qb:
-            qb = QuickBooks()
+            qb = QuickBooks.get_shared()
 
         json_data = qb.get_single_object(cls.qbo_object_name, pk=id, params=params)
 
@@ -105,11 +246,16 @@ class ReadMixin(object):
         else:
             return cls.from_json(json_data[cls.qbo_object_name])
 
+    @classmethod
+    async def aget(cls, *args, **kwargs):
+        """Async version of get, takes the same arguments"""
+        return await _run_in_executor(cls.get, *args, **kwargs)
+
 
 class SendMixin(object):
     def send(self, qb=None, send_to=None):
         if not qb:
-            qb = QuickBooks()
+            qb = QuickBooks.get_shared()
 
         end_point = "{0}/{1}/send".format(self.qbo_object_name.lower(), self.Id)
 
@@ -172,17 +318,16 @@ class VoidMixin(object):
 
     def void(self, qb=None):
         if not qb:
-            qb = QuickBooks()
+            qb = QuickBooks.get_shared()
 
         if not self.Id:
             raise QuickbooksException('Cannot void unsaved object')
 
-        endpoint = self.qbo_object_name.lower()
-        url = "{0}/company/{1}/{2}".format(qb.api_url, qb.company_id, endpoint)
+        url = "{0}/{1}".format(qb.company_url, self.qbo_object_name.lower())
 
         data = self.get_void_data()
         params = self.get_void_params()
-        results = qb.post(url, json.dumps(data, cls=DecimalEncoder), params=params)
+        results = qb.post(url, dumps(data), params=params)
 
         return results
 
@@ -193,7 +338,7 @@ class UpdateMixin(object):
 
     def save(self, qb=None, request_id=None, params=None):
         if not qb:
-            qb = QuickBooks()
+            qb = QuickBooks.get_shared()
 
         if self.Id and int(self.Id) > 0:
             json_data = qb.update_object(self.qbo_object_name, self.to_json(), request_id=request_id, params=params)
@@ -208,6 +353,10 @@ class UpdateMixin(object):
         self.Id = obj.Id
         return obj
 
+    async def asave(self, *args, **kwargs):
+        """Async version of save, takes the same arguments"""
+        return await _run_in_executor(self.save, *args, **kwargs)
+
 
 class UpdateNoIdMixin(object):
     qbo_object_name = ""
@@ -215,7 +364,7 @@ class UpdateNoIdMixin(object):
 
     def save(self, qb=None, request_id=None):
         if not qb:
-            qb = QuickBooks()
+            qb = QuickBooks.get_shared()
 
         json_data = qb.update_object(self.qbo_object_name, self.to_json(), request_id=request_id)
         obj = type(self).from_json(json_data[self.qbo_object_name])
@@ -227,7 +376,7 @@ class DeleteMixin(object):
 
     def delete(self, qb=None, request_id=None):
         if not qb:
-            qb = QuickBooks()
+            qb = QuickBooks.get_shared()
 
         if not self.Id:
             raise QuickbooksException('Cannot delete unsaved object')
@@ -236,7 +385,7 @@ class DeleteMixin(object):
             'Id': self.Id,
             'SyncToken': self.SyncToken,
         }
-        return qb.delete_object(self.qbo_object_name, json.dumps(data, cls=DecimalEncoder), request_id=request_id)
+        return qb.delete_object(self.qbo_object_name, dumps(data), request_id=request_id)
 
 
 class DeleteNoIdMixin(object):
@@ -244,7 +393,7 @@ class DeleteNoIdMixin(object):
 
     def delete(self, qb=None, request_id=None):
         if not qb:
-            qb = QuickBooks()
+            qb = QuickBooks.get_shared()
 
         return qb.delete_object(self.qbo_object_name, self.to_json(), request_id=request_id)
 
@@ -257,25 +406,70 @@ class ListMixin(object):
     def all(cls, order_by="", start_position="", max_results=100, qb=None):
         """Returns list of objects containing all objects in the QuickBooks database"""
         if qb is None:
-            qb = QuickBooks()
+            qb = QuickBooks.get_shared()
 
         # For Item objects, we need to explicitly request the SKU field
         if cls.qbo_object_name == "Item":
-            select = "SELECT *, Sku FROM {0}".format(cls.qbo_object_name)
+            parts = ["SELECT *, Sku FROM Item"]
         else:
-            select = "SELECT * FROM {0}".format(cls.qbo_object_name)
+            parts = ["SELECT * FROM " + cls.qbo_object_name]
 
         if order_by:
-            select += " ORDER BY {0}".format(order_by)
+            parts.append("ORDER BY {0}".format(order_by))
 
         if start_position:
-            select += " STARTPOSITION {0}".format(start_position)
+            parts.append("STARTPOSITION {0}".format(start_position))
 
         if max_results:
-            select += " MAXRESULTS {0}".format(max_results)
+            parts.append("MAXRESULTS {0}".format(max_results))
+
+        select = " ".join(parts)
 
         return cls.query(select, qb=qb)
 
+    @classmethod
+    def iter_all(cls, where_clause="", order_by="Id", page_size=1000, concurrency=8, qb=None):
+        """
+        Yields all objects matching where_clause, fetching the pages concurrently
+        :param where_clause: QBO SQL where clause (DO NOT include 'WHERE')
+        :param order_by: pages are fetched independently, so this needs to give a stable order
+        :param page_size: objects per request (QBO returns at most 1000)
+        :param concurrency: maximum number of pages requested ahead of the caller
+        :param qb:
+        :return: Generator of objects
+        """
+        if not qb:
+            qb = QuickBooks.get_shared()
+
+        total = cls.count(where_clause, qb=qb) or 0
+        start_positions = iter(range(1, total + 1, page_size))
+        pending = deque()
+
+        def fetch_page(start_position):
+            return cls.where(where_clause, order_by=order_by, start_position=start_position,
+                             max_results=page_size, qb=qb)
+
+        def submit_next():
+            start_position = next(start_positions, None)
+            if start_position is not None:
+                pending.append(executor.submit(fetch_page, start_position))
+
+        # Only keep `concurrency` pages in flight, so a caller that stops early
+        # doesn't pay for (or hold in memory) the rest of the result set
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            try:
+                for _ in range(concurrency):
+                    submit_next()
+
+                while pending:
+                    page = pending.popleft().result()
+                    submit_next()
+
+                    yield from page
+            finally:
+                for future in pending:
+                    future.cancel()
+
     @classmethod
     def filter(cls, order_by="", start_position="", max_results="", qb=None, **kwargs):
         """
@@ -310,22 +504,21 @@ class ListMixin(object):
         :param qb:
         :return: Returns list filtered by input where_clause
         """
+        parts = ["SELECT * FROM " + cls.qbo_object_name]
+
         if where_clause:
-            where_clause = "WHERE " + where_clause
+            parts.append("WHERE " + where_clause)
 
         if order_by:
-            order_by = " ORDERBY " + order_by
+            parts.append("ORDERBY " + order_by)
 
         if start_position != "":
-            start_position = " STARTPOSITION " + str(start_position)
+            parts.append("STARTPOSITION {0}".format(start_position))
 
         if max_results:
-            max_results = " MAXRESULTS " + str(max_results)
+            parts.append("MAXRESULTS {0}".format(max_results))
 
-        select = "SELECT * FROM {0} {1}{2}{3}{4}".format(
-            cls.qbo_object_name, where_clause, order_by, start_position, max_results)
-
-        return cls.query(select, qb=qb)
+        return cls.query(" ".join(parts), qb=qb)
 
     @classmethod
     def query(cls, select, qb=None):
@@ -335,22 +528,26 @@ class ListMixin(object):
         :return: Returns list
         """
         if not qb:
-            qb = QuickBooks()
+            qb = QuickBooks.get_shared()
 
         json_data = qb.query(select)
 
-        obj_list = []
-
         if cls.qbo_json_object_name != '':
             object_name = cls.qbo_json_object_name
         else:
             object_name = cls.qbo_object_name
 
-        if object_name in json_data["QueryResponse"]:
-            for item_json in json_data["QueryResponse"][object_name]:
-                obj_list.append(cls.from_json(item_json))
+        rows = json_data["QueryResponse"].get(object_name)
+        if not rows:
+            return []
 
-        return obj_list
+        from_json = cls.from_json
+        return [from_json(item_json) for item_json in rows]
+
+    @classmethod
+    async def aquery(cls, *args, **kwargs):
+        """Async version of query, takes the same arguments"""
+        return await _run_in_executor(cls.query, *args, **kwargs)
 
     @classmethod
     def count(cls, where_clause="", qb=None):
@@ -360,20 +557,16 @@ class ListMixin(object):
         :return: Returns database record count
         """
         if not qb:
-            qb = QuickBooks()
+            qb = QuickBooks.get_shared()
 
-        if where_clause:
-            where_clause = "WHERE " + where_clause
+        select = "SELECT COUNT(*) FROM " + cls.qbo_object_name
 
-        select = "SELECT COUNT(*) FROM {0} {1}".format(
-            cls.qbo_object_name, where_clause)
+        if where_clause:
+            select += " WHERE " + where_clause
 
         json_data = qb.query(select)
 
-        if "totalCount" in json_data["QueryResponse"]:
-            return json_data["QueryResponse"]["totalCount"]
-        else:
-            return None
+        return json_data.get("QueryResponse", {}).get("totalCount")
 
 
 class QuickbooksPdfDownloadable(object):
@@ -390,7 +583,10 @@ class QuickbooksPdfDownloadable(object):
 
 class ObjectListMixin(object):
     qbo_object_name = ""
-    _object_list = []
+
+    def __init__(self):
+        super(ObjectListMixin, self).__init__()
+        self._object_list = []
 
     def __iter__(self):
         return self._object_list.__iter__()
@@ -428,8 +624,8 @@ class PrefMixin(object):
     @classmethod
     def get(cls, qb=None):
         if not qb:
-            qb = QuickBooks()
+            qb = QuickBooks.get_shared()
 
-        end_point = "{0}/company/{1}/preferences".format(qb.api_url, qb.company_id)
+        end_point = "{0}/preferences".format(qb.company_url)
         json_data = qb.get(end_point, {})
         return cls.from_json(json_data[cls.qbo_object_name])
@@ -52,7 +52,7 @@ class Attachable(DeleteMixin, QuickbooksManagedObject, QuickbooksTransactionEnti
 
     def save(self, qb=None):
         if not qb:
-            qb = QuickBooks()
+            qb = QuickBooks.get_shared()
 
         # Validate that we have either file path or bytes, but not both
         if self._FilePath and self._FileBytes:
@@ -49,7 +49,7 @@ class TaxService(QuickbooksBaseObject, UpdateMixin):
 
     def save(self, qb=None):
         if not qb:
-            qb = QuickBooks()
+            qb = QuickBooks.get_shared()
 
         if self.TaxCodeId and self.TaxCodeId > 0:
             json_data = qb.update_object(self.qbo_object_name, self.to_json())
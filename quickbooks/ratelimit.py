@@ -0,0 +1,54 @@
+import threading
+import time
+
+
+class TokenBucket(object):
+    """
+    Token bucket allowing `rate` requests every `per` seconds. Callers that find the
+    bucket empty reserve a token and sleep until it has been refilled.
+    """
+    def __init__(self, rate, per):
+        self.capacity = float(rate)
+        self.fill_rate = float(rate) / per
+        self.tokens = float(rate)
+        self.timestamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self):
+        """
+        Takes a token from the bucket, blocking if none are available
+        :return: Seconds spent waiting
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.timestamp) * self.fill_rate)
+            self.timestamp = now
+            self.tokens -= 1
+
+            wait = -self.tokens / self.fill_rate if self.tokens < 0 else 0
+
+        if wait:
+            time.sleep(wait)
+
+        return wait
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(key, rate, per):
+    """
+    Returns the process-wide bucket for key (for example a company id) and limit,
+    creating it on first use so that every client talking to the same realm with the
+    same limit shares one bucket. Clients passing a different limit get their own.
+    """
+    bucket_key = (key, rate, per)
+
+    with _buckets_lock:
+        bucket = _buckets.get(bucket_key)
+
+        if bucket is None:
+            bucket = _buckets[bucket_key] = TokenBucket(rate, per)
+
+        return bucket
@@ -36,6 +36,10 @@ setup(
         'python-dateutil',
     ],
 
+    extras_require={
+        'orjson': ['orjson>=3.0'],
+    },
+
     classifiers=[
         'Development Status :: 3 - Alpha',
         'Intended Audience :: Developers',
@@ -1,8 +1,14 @@
+import base64
+import io
 import json
+import tempfile
+import unittest
 import warnings
 from tests.integration.test_base import QuickbooksUnitTestCase
 from unittest.mock import patch, mock_open
 
+from requests.adapters import HTTPAdapter
+
 from quickbooks.exceptions import QuickbooksException, SevereException, AuthorizationException
 from quickbooks import client, mixins
 from quickbooks.objects.salesreceipt import SalesReceipt
@@ -68,6 +74,37 @@ class ClientTest(QuickbooksUnitTestCase):
 
         self.assertTrue("sandbox" in api_url)
 
+    def test_company_url(self):
+        qb_client = client.QuickBooks(company_id="1234")
+        qb_client.sandbox = True
+
+        self.assertEqual(qb_client.company_url, "https://sandbox-quickbooks.api.intuit.com/v3/company/1234")
+
+    def test_get_shared(self):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            qb_client = client.QuickBooks.get_shared()
+
+        self.addCleanup(qb_client._drop)
+
+        self.assertEqual(caught, [])
+        self.assertEqual(qb_client.minorversion, client.QuickBooks.MINIMUM_MINOR_VERSION)
+        self.assertIs(qb_client, client.QuickBooks.get_shared())
+
+        # the shared client is not the slot used by global mode
+        with patch.object(client.QuickBooks, '_QuickBooks__use_global', True):
+            self.assertIsNot(qb_client, client.QuickBooks(minorversion=75))
+
+    def test_session_connection_pool(self):
+        qb_client = client.QuickBooks(auth_client=self.auth_client, refresh_token='REFRESH_TOKEN')
+        adapter = qb_client.session.get_adapter(qb_client.api_url)
+
+        self.assertIsInstance(adapter, HTTPAdapter)
+        self.assertEqual(adapter._pool_maxsize, client.QuickBooks.POOL_MAXSIZE)
+        self.assertEqual(adapter.max_retries.total, client.QuickBooks.MAX_RETRIES)
+        # throttling is retried by process_request, where each attempt takes a token
+        self.assertFalse(adapter.max_retries.is_retry("GET", 429, has_retry_after=True))
+
     def test_isvalid_object_name_valid(self):
         qb_client = client.QuickBooks()
         result = qb_client.isvalid_object_name("Customer")
@@ -176,6 +213,27 @@ class ClientTest(QuickbooksUnitTestCase):
                 headers={'Content-Type': 'application/json', 'Accept': 'application/json', 'User-Agent': 'python-quickbooks V3 library'}, 
                 params={'minorversion': client.QuickBooks.MINIMUM_MINOR_VERSION})
 
+    @patch('quickbooks.client.get_bucket')
+    @patch('quickbooks.client.time.sleep')
+    def test_process_request_retries_throttled(self, sleep, get_bucket):
+        qb_client = client.QuickBooks()
+        qb_client.session = MockSession(responses=[MockThrottledResponse(), MockResponse()])
+
+        response = qb_client.process_request("POST", "https://example.com", headers={})
+
+        self.assertEqual(response.status_code, 200)
+        sleep.assert_called_once_with(2.0)
+        self.assertEqual(get_bucket.return_value.consume.call_count, 2)
+
+    def test_retry_after(self):
+        for header, expected in (('2', 2.0), ('-5', 0), ('86400', client.QuickBooks.MAX_RETRY_AFTER),
+                                 ('soon', 1.0), ('nan', 1.0), (None, 1.0)):
+            with self.subTest(header=header):
+                response = MockThrottledResponse()
+                response.headers = {} if header is None else {'Retry-After': header}
+
+                self.assertEqual(client.QuickBooks._retry_after(response, 1), expected)
+
     def test_handle_exceptions(self):
         qb_client = client.QuickBooks()
         error_data = {
@@ -253,11 +311,56 @@ class ClientTest(QuickbooksUnitTestCase):
                                    file_path=file_path)
             
             mock_file.assert_called_once_with(file_path, 'rb')
-            mock_file.return_value.__enter__.return_value.read.assert_called_once()
+            # the file is streamed by the session, so nothing is read up front
+            mock_file.return_value.__enter__.return_value.read.assert_not_called()
             mock_file.return_value.__exit__.assert_called_once()
         process_request.assert_called_once()
 
 
+class MultipartStreamTest(unittest.TestCase):
+    def test_read(self):
+        body = client.MultipartStream('boundary', '{"ContentType": "text/plain"}', io.BytesIO(b'file content'))
+        length = len(body)
+
+        data = body.read()
+
+        self.assertEqual(len(data), length)
+        self.assertTrue(data.startswith(b'--boundary\r\n'))
+        self.assertIn(b'Content-Type: text/plain\r\nContent-Transfer-Encoding: base64\r\n\r\n'
+                      b'ZmlsZSBjb250ZW50\r\n--boundary--', data)
+
+    def test_filename_escaped(self):
+        body = client.MultipartStream(
+            'boundary', '{"ContentType": "text/plain", "FileName": "a\\"b.txt"}', io.BytesIO(b''))
+
+        self.assertIn(b'name="file_content_01"; filename="a%22b.txt"\r\n', body.read())
+
+    def test_read_large_file_in_chunks(self):
+        with tempfile.TemporaryFile() as attachment:
+            content = bytes(range(256)) * (40 * 1024) + b'x'
+            attachment.write(content)
+            attachment.seek(0)
+
+            body = client.MultipartStream('boundary', '{"ContentType": "text/plain", "FileName": "a.txt"}', attachment)
+            length = len(body)
+
+            chunks = []
+            chunk = body.read(8192)
+            while chunk:
+                self.assertTrue(len(chunk) <= 8192)
+                chunks.append(chunk)
+                chunk = body.read(8192)
+
+            data = b''.join(chunks)
+            self.assertEqual(len(data), length)
+
+            encoded = data.split(b'base64\r\n\r\n')[1].split(b'\r\n--boundary--')[0]
+            self.assertEqual(base64.b64decode(encoded, validate=True), content)
+
+            body.seek(0)
+            self.assertEqual(len(body), length)
+
+
 class MockResponse(object):
     @property
     def text(self):
@@ -288,6 +391,12 @@ class MockResponseJson:
         return self.json_data
 
 
+class MockThrottledResponse(object):
+    status_code = 429
+    headers = {'Retry-After': '2'}
+    text = ""
+
+
 class MockUnauthorizedResponse(object):
     @property
     def text(self):
@@ -322,8 +431,11 @@ class MockSessionManager(object):
 
 
 class MockSession(object):
-    def __init__(self):
+    def __init__(self, responses=None):
         self.access_token = "test_access_token"
+        self.responses = responses or []
 
     def request(self, request_type, url, headers=None, params=None, data=None, **kwargs):
+        if self.responses:
+            return self.responses.pop(0)
         return MockResponse()
@@ -1,5 +1,6 @@
 from decimal import Decimal
 import unittest
+from quickbooks.client import QuickBooks
 from quickbooks.objects.bill import Bill
 from quickbooks.objects.detailline import DetailLine
 
@@ -18,4 +19,12 @@ class DecimalTestCase(unittest.TestCase):
         json_data = bill.to_json()
         
         # Verify the amount was converted correctly
-        self.assertIn('"Amount": "42.42"', json_data)
+        self.assertIn('"Amount":"42.42"', json_data)
+
+    def test_response_floats_parsed_as_decimal(self):
+        """Test that use_decimal parses response amounts straight to Decimal"""
+        qb_client = QuickBooks(use_decimal=True)
+
+        result = qb_client._loads('{"Bill": {"TotalAmt": 42.42}}')
+
+        self.assertEqual(result["Bill"]["TotalAmt"], Decimal('42.42'))
@@ -1,21 +1,122 @@
+import asyncio
+import time
 import unittest
 from urllib.parse import quote
 from unittest import TestCase
 from datetime import datetime
-from unittest.mock import patch, ANY
+from unittest.mock import patch, Mock, create_autospec
 
 from quickbooks.objects import Bill, Invoice, Payment, BillPayment
 
-from tests.integration.test_base import QuickbooksUnitTestCase
-from tests.unit.test_client import MockSession
-
+from quickbooks.exceptions import QuickbooksException
 from quickbooks.objects.base import PhoneNumber, QuickbooksBaseObject
 from quickbooks.objects.department import Department
 from quickbooks.objects.customer import Customer
 from quickbooks.objects.journalentry import JournalEntry, JournalEntryLine
 from quickbooks.objects.recurringtransaction import RecurringTransaction
 from quickbooks.objects.salesreceipt import SalesReceipt
-from quickbooks.mixins import ObjectListMixin
+from quickbooks.client import QuickBooks
+from quickbooks.mixins import ObjectListMixin, ListMixin
+
+
+def swap(test_case, obj, attr, new=None):
+    """
+    Replaces a class attribute with new (a Mock by default) until the test finishes.
+    Direct assignment avoids the target lookup and patcher setup done by mock.patch.
+    """
+    if new is None:
+        new = Mock()
+
+    # keep the raw descriptor (e.g. the classmethod) so it is restored unbound
+    old = vars(obj)[attr]
+    setattr(obj, attr, new)
+    test_case.addCleanup(setattr, obj, attr, old)
+
+    return new
+
+
+def swap_client_method(test_case, name):
+    """
+    Replaces QuickBooks.<name> with an autospec mock. Unlike a plain mock it binds like the
+    real method, so the client it was called on is recorded as the first argument.
+    """
+    return swap(test_case, QuickBooks, name, create_autospec(vars(QuickBooks)[name]))
+
+
+def recorder():
+    """
+    Plain function that records its (args, kwargs) in .calls, for tests that only need
+    to know a method was called. Much cheaper to create than a MagicMock.
+    """
+    calls = []
+
+    def record(*args, **kwargs):
+        calls.append((args, kwargs))
+
+    record.calls = calls
+
+    return record
+
+
+def _build_qb_client():
+    qb_client = QuickBooks(
+        refresh_token='REFRESH_TOKEN',
+        company_id='COMPANY_ID',
+        minorversion=75
+    )
+    qb_client.sandbox = True
+
+    return qb_client
+
+
+# Built once at import and shallow copied per test. Tests must only set attributes on their copy.
+_TEMPLATE_CLIENT = _build_qb_client()
+
+
+class MixinTestCase(TestCase):
+    # QuickBooks methods replaced by one autospec mock per class, reset before each test
+    mocked_methods = ()
+
+    @classmethod
+    def setUpClass(cls):
+        super(MixinTestCase, cls).setUpClass()
+
+        cls._originals = dict((name, vars(QuickBooks)[name]) for name in cls.mocked_methods)
+        cls.mocks = dict((name, create_autospec(cls._originals[name])) for name in cls.mocked_methods)
+
+        for name, mock in cls.mocks.items():
+            setattr(QuickBooks, name, mock)
+
+    @classmethod
+    def tearDownClass(cls):
+        for name, original in cls._originals.items():
+            setattr(QuickBooks, name, original)
+
+        super(MixinTestCase, cls).tearDownClass()
+
+    def setUp(self):
+        super(MixinTestCase, self).setUp()
+
+        # bypass QuickBooks.__new__, which warns about minorversion and may return the global client
+        self.qb_client = object.__new__(QuickBooks)
+        self.qb_client.__dict__.update(_TEMPLATE_CLIENT.__dict__)
+        # qb=None calls create the process-wide shared client, don't let it leak into other tests
+        self.addCleanup(self.qb_client._drop)
+
+        for mock in self.mocks.values():
+            mock.reset_mock()
+
+    def for_each_client(self, check, *mocks):
+        """
+        Runs check(qb, client) in a subTest for qb=None and for qb=self.qb_client, resetting
+        mocks first. client is the QuickBooks instance the call is expected to use.
+        """
+        for qb in (None, self.qb_client):
+            with self.subTest(qb=qb):
+                for mock in mocks:
+                    mock.reset_mock()
+
+                check(qb, qb or QuickBooks.get_shared())
 
 
 class ToJsonMixinTest(unittest.TestCase):
@@ -25,30 +126,51 @@ class ToJsonMixinTest(unittest.TestCase):
 
         json = phone.to_json()
 
-        self.assertEqual(json, '{\n    "FreeFormNumber": "555-555-5555"\n}')
+        self.assertEqual(json, '{"FreeFormNumber":"555-555-5555"}')
 
+    def test_to_json_pretty(self):
+        phone = PhoneNumber()
+        phone.FreeFormNumber = "555-555-5555"
 
-class FromJsonMixinTest(unittest.TestCase):
-    def setUp(self):
-        self.json_data = {
-            'DocNumber': '123',
-            'TotalAmt': 100,
-            'Line': [
-                {
-                    "Id": "0",
-                    "Description": "Test",
-                    "Amount": 25.54,
-                    "DetailType": "JournalEntryLineDetail",
-                    "JournalEntryLineDetail": {
-                        "PostingType": "Debit",
-                    }
-                },
-            ],
-        }
+        json = phone.to_json(pretty=True)
+
+        self.assertEqual(json, '{\n  "FreeFormNumber": "555-555-5555"\n}')
+
+    def test_to_json_non_ascii(self):
+        customer = Customer()
+        customer.DisplayName = "Zoë Café"
+
+        json = customer.to_json()
+
+        # the stdlib fallback matches orjson, which writes non-ASCII text as is
+        with patch('quickbooks.mixins.orjson', None):
+            self.assertEqual(customer.to_json(), json)
 
+        self.assertIn('"DisplayName":"Zoë Café"', json)
+
+
+# Shared by the from_json and to_dict tests, neither of which mutates it
+_JOURNAL_JSON = {
+    'DocNumber': '123',
+    'TotalAmt': 100,
+    'Line': [
+        {
+            "Id": "0",
+            "Description": "Test",
+            "Amount": 25.54,
+            "DetailType": "JournalEntryLineDetail",
+            "JournalEntryLineDetail": {
+                "PostingType": "Debit",
+            }
+        },
+    ],
+}
+
+
+class FromJsonMixinTest(unittest.TestCase):
     def test_from_json(self):
         entry = JournalEntry()
-        new_obj = entry.from_json(self.json_data)
+        new_obj = entry.from_json(_JOURNAL_JSON)
 
         self.assertEqual(type(new_obj), JournalEntry)
         self.assertEqual(new_obj.DocNumber, "123")
@@ -64,205 +186,227 @@ class FromJsonMixinTest(unittest.TestCase):
     def test_from_json_missing_detail_object(self):
         test_obj = QuickbooksBaseObject()
 
-        new_obj = test_obj.from_json(self.json_data)
+        new_obj = test_obj.from_json(_JOURNAL_JSON)
 
         self.assertEqual(type(new_obj), QuickbooksBaseObject)
         self.assertEqual(new_obj.DocNumber, "123")
         self.assertEqual(new_obj.TotalAmt, 100)
 
 
+_EXPECTED_TO_DICT = {
+    'DocNumber': '123',
+    'SyncToken': 0,
+    'domain': 'QBO',
+    'TxnDate': '',
+    'TotalAmt': 100,
+    'ExchangeRate': 1,
+    'CurrencyRef': None,
+    'PrivateNote': '',
+    'sparse': False,
+    'Line': [{
+        'LinkedTxn': [],
+        'Description': 'Test',
+        'JournalEntryLineDetail': {
+            'TaxAmount': 0,
+            'Entity': None,
+            'DepartmentRef': None,
+            'TaxCodeRef': None,
+            'BillableStatus': None,
+            'TaxApplicableOn': 'Sales',
+            'PostingType': 'Debit',
+            'AccountRef': None,
+            'ClassRef': None,
+        },
+        'DetailType': 'JournalEntryLineDetail',
+        'LineNum': 0,
+        'Amount': 25.54,
+        'CustomField': [],
+        'Id': '0',
+    }],
+    'Adjustment': False,
+    'Id': None,
+    'TxnTaxDetail': None,
+}
+
+
 class ToDictMixinTest(unittest.TestCase):
     def test_to_dict(self):
-        json_data = {
-            'DocNumber': '123',
-            'TotalAmt': 100,
-            'Line': [
-                {
-                    "Id": "0",
-                    "Description": "Test",
-                    "Amount": 25.54,
-                    "DetailType": "JournalEntryLineDetail",
-                    "JournalEntryLineDetail": {
-                        "PostingType": "Debit",
-                    }
-                },
-            ],
-        }
-
-        entry = JournalEntry.from_json(json_data)
-        expected = {
-            'DocNumber': '123',
-            'SyncToken': 0,
-            'domain': 'QBO',
-            'TxnDate': '',
-            'TotalAmt': 100,
-            'ExchangeRate': 1,
-            'CurrencyRef': None,
-            'PrivateNote': '',
-            'sparse': False,
-            'Line': [{
-                'LinkedTxn': [],
-                'Description': 'Test',
-                'JournalEntryLineDetail': {
-                    'TaxAmount': 0,
-                    'Entity': None,
-                    'DepartmentRef': None,
-                    'TaxCodeRef': None,
-                    'BillableStatus': None,
-                    'TaxApplicableOn': 'Sales',
-                    'PostingType': 'Debit',
-                    'AccountRef': None,
-                    'ClassRef': None,
-                },
-                'DetailType': 'JournalEntryLineDetail',
-                'LineNum': 0,
-                'Amount': 25.54,
-                'CustomField': [],
-                'Id': '0',
-            }],
-            'Adjustment': False,
-            'Id': None,
-            'TxnTaxDetail': None,
-        }
-
-        self.assertEqual(expected, entry.to_dict())
-
-
-class ListMixinTest(QuickbooksUnitTestCase):
-    @patch('quickbooks.mixins.ListMixin.query')
-    def test_all(self, query):
-        query.return_value = []
-        Department.all()
-        query.assert_called_once_with("SELECT * FROM Department MAXRESULTS 100", qb=ANY)
-
-    def test_all_with_qb(self):
-        self.qb_client.session = MockSession()  # Add a mock session
-        with patch.object(self.qb_client, 'query') as query:
-            Department.all(qb=self.qb_client)
-            query.assert_called_once()
-
-    @patch('quickbooks.mixins.ListMixin.where')
-    def test_filter(self, where):
-        Department.filter(max_results=25, start_position='1', Active=True)
-        where.assert_called_once_with("Active = True", max_results=25, start_position='1',
-                                      order_by='', qb=None)
-
-    def test_filter_with_qb(self):
-        with patch.object(self.qb_client, 'query') as query:
-            Department.filter(Active=True, qb=self.qb_client)
-            self.assertTrue(query.called)
-
-    @patch('quickbooks.mixins.ListMixin.query')
-    def test_where(self, query):
-        Department.where("Active=True", start_position=1, max_results=10)
-        query.assert_called_once_with("SELECT * FROM Department WHERE Active=True STARTPOSITION 1 MAXRESULTS 10",
-                                      qb=None)
+        entry = JournalEntry.from_json(_JOURNAL_JSON)
+        self.assertEqual(_EXPECTED_TO_DICT, entry.to_dict())
+
+
+class ListMixinTest(MixinTestCase):
+    def test_all(self):
+        query = swap(self, ListMixin, 'query')
+
+        def check(qb, client):
+            Department.all(qb=qb)
+            query.assert_called_once_with("SELECT * FROM Department MAXRESULTS 100", qb=client)
+
+        self.for_each_client(check, query)
+
+    def test_iter_all(self):
+        count = swap(self, ListMixin, 'count')
+        where = swap(self, ListMixin, 'where')
+        count.return_value = 5
+        where.side_effect = lambda *args, **kwargs: [kwargs['start_position']]
+
+        results = list(Department.iter_all(where_clause="Active=True", page_size=2, qb=self.qb_client))
+
+        self.assertEqual(results, [1, 3, 5])
+        count.assert_called_once_with("Active=True", qb=self.qb_client)
+        where.assert_any_call("Active=True", order_by="Id", start_position=3, max_results=2, qb=self.qb_client)
+
+    def test_iter_all_bounded(self):
+        count = swap(self, ListMixin, 'count')
+        where = swap(self, ListMixin, 'where')
+        count.return_value = 50000
+        where.side_effect = lambda *args, **kwargs: [kwargs['start_position']]
 
-    @patch('quickbooks.mixins.ListMixin.query')
-    def test_where_start_position_0(self, query):
+        results = Department.iter_all(page_size=1000, concurrency=2, qb=self.qb_client)
+        next(results)
+        # give the pool the chance to run ahead of the caller
+        time.sleep(0.05)
+        results.close()
+
+        # one page consumed plus at most `concurrency` requested ahead
+        self.assertLessEqual(where.call_count, 1 + 2)
+
+    def test_filter(self):
+        where = swap(self, ListMixin, 'where')
+
+        def check(qb, client):
+            Department.filter(max_results=25, start_position='1', Active=True, qb=qb)
+            where.assert_called_once_with("Active = True", max_results=25, start_position='1',
+                                          order_by='', qb=qb)
+
+        self.for_each_client(check, where)
+
+    def test_where(self):
+        query = swap(self, ListMixin, 'query')
+
+        def check(qb, client):
+            Department.where("Active=True", start_position=1, max_results=10, qb=qb)
+            query.assert_called_once_with(
+                "SELECT * FROM Department WHERE Active=True STARTPOSITION 1 MAXRESULTS 10", qb=qb)
+
+        self.for_each_client(check, query)
+
+    def test_where_start_position_0(self):
+        query = swap(self, ListMixin, 'query')
         Department.where("Active=True", start_position=0, max_results=10)
         query.assert_called_once_with("SELECT * FROM Department WHERE Active=True STARTPOSITION 0 MAXRESULTS 10",
                                       qb=None)
 
-    def test_where_with_qb(self):
-        with patch.object(self.qb_client, 'query') as query:
-            Department.where("Active=True", start_position=1, max_results=10, qb=self.qb_client)
-            self.assertTrue(query.called)
+    def test_where_without_where_clause(self):
+        query = swap(self, ListMixin, 'query')
+        Department.where(order_by="Name", max_results=10)
+        query.assert_called_once_with("SELECT * FROM Department ORDERBY Name MAXRESULTS 10", qb=None)
+
+    def test_query(self):
+        query = swap_client_method(self, 'query')
+        select = "SELECT * FROM Department WHERE Active=True"
+
+        def check(qb, client):
+            Department.query(select, qb=qb)
+            query.assert_called_once_with(client, select)
+
+        self.for_each_client(check, query)
 
-    @patch('quickbooks.mixins.QuickBooks.query')
-    def test_query(self, query):
+    def test_aquery(self):
+        query = swap_client_method(self, 'query')
         select = "SELECT * FROM Department WHERE Active=True"
-        Department.query(select)
-        query.assert_called_once_with(select)
-
-    def test_query_with_qb(self):
-        with patch.object(self.qb_client, 'query') as query:
-            select = "SELECT * FROM Department WHERE Active=True"
-            Department.query(select, qb=self.qb_client)
-            self.assertTrue(query.called)
-
-    @patch('quickbooks.mixins.ListMixin.where')
-    def test_choose(self, where):
-        Department.choose(['name1', 'name2'], field="Name")
-        where.assert_called_once_with("Name in ('name1', 'name2')", qb=None)
-
-    def test_choose_with_qb(self):
-        with patch.object(self.qb_client, 'query') as query:
-            Department.choose(['name1', 'name2'], field="Name", qb=self.qb_client)
-            self.assertTrue(query.called)
-
-    @patch('quickbooks.mixins.QuickBooks.query')
-    def test_count(self, query):
+        asyncio.run(Department.aquery(select, qb=self.qb_client))
+        query.assert_called_once_with(self.qb_client, select)
+
+    def test_choose(self):
+        where = swap(self, ListMixin, 'where')
+
+        def check(qb, client):
+            Department.choose(['name1', 'name2'], field="Name", qb=qb)
+            where.assert_called_once_with("Name in ('name1', 'name2')", qb=qb)
+
+        self.for_each_client(check, where)
+
+    def test_count(self):
+        query = swap_client_method(self, 'query')
         count = Department.count(where_clause="Active=True", qb=self.qb_client)
-        query.assert_called_once_with("SELECT COUNT(*) FROM Department WHERE Active=True")
+        query.assert_called_once_with(self.qb_client, "SELECT COUNT(*) FROM Department WHERE Active=True")
 
-    @patch('quickbooks.mixins.ListMixin.query')
-    def test_order_by(self, query):
-        Customer.filter(Active=True, order_by='DisplayName')
-        query.assert_called_once_with("SELECT * FROM Customer WHERE Active = True ORDERBY DisplayName", qb=None)
+    def test_order_by(self):
+        query = swap(self, ListMixin, 'query')
 
-    def test_order_by_with_qb(self):
-        with patch.object(self.qb_client, 'query') as query:
-            Customer.filter(Active=True, order_by='DisplayName', qb=self.qb_client)
-            self.assertTrue(query.called)
+        def check(qb, client):
+            Customer.filter(Active=True, order_by='DisplayName', qb=qb)
+            query.assert_called_once_with(
+                "SELECT * FROM Customer WHERE Active = True ORDERBY DisplayName", qb=qb)
 
+        self.for_each_client(check, query)
 
-class ReadMixinTest(QuickbooksUnitTestCase):
-    @patch('quickbooks.mixins.QuickBooks.get_single_object')
-    def test_get(self, get_single_object):
-        Department.get(1)
-        get_single_object.assert_called_once_with("Department", pk=1, params=None)
 
-    def test_get_with_qb(self):
-        with patch.object(self.qb_client, 'get_single_object') as get_single_object:
-            Department.get(1, qb=self.qb_client)
-            self.assertTrue(get_single_object.called)
+class ReadMixinTest(MixinTestCase):
+    def test_get(self):
+        get_single_object = swap_client_method(self, 'get_single_object')
 
+        def check(qb, client):
+            Department.get(1, qb=qb)
+            get_single_object.assert_called_once_with(client, "Department", pk=1, params=None)
 
-class UpdateMixinTest(QuickbooksUnitTestCase):
-    @patch('quickbooks.mixins.QuickBooks.create_object')
-    def test_save_create(self, create_object):
-        department = Department()
-        department.save(qb=self.qb_client)
-        create_object.assert_called_once_with("Department", department.to_json(), request_id=None, params=None)
+        self.for_each_client(check, get_single_object)
+
+    def test_aget(self):
+        get_single_object = swap_client_method(self, 'get_single_object')
+        asyncio.run(Department.aget(1, qb=self.qb_client))
+        get_single_object.assert_called_once_with(self.qb_client, "Department", pk=1, params=None)
+
+
+class UpdateMixinTest(MixinTestCase):
+    mocked_methods = ('create_object', 'update_object')
+
+    def test_save_create(self):
+        create_object = self.mocks['create_object']
 
-    def test_save_create_with_qb(self):
-        with patch.object(self.qb_client, 'create_object') as create_object:
+        def check(qb, client):
             department = Department()
-            department.save(qb=self.qb_client)
-            self.assertTrue(create_object.called)
+            department.save(qb=qb)
+            create_object.assert_called_once_with(
+                client, "Department", department.to_json(), request_id=None, params=None)
 
-    @patch('quickbooks.mixins.QuickBooks.update_object')
-    def test_save_update(self, update_object):
+        self.for_each_client(check, create_object)
+
+    def test_asave(self):
+        create_object = self.mocks['create_object']
         department = Department()
-        department.Id = 1
-        json = department.to_json()
+        asyncio.run(department.asave(qb=self.qb_client))
+        create_object.assert_called_once_with(
+            self.qb_client, "Department", department.to_json(), request_id=None, params=None)
 
-        department.save(qb=self.qb_client)
-        update_object.assert_called_once_with("Department", json, request_id=None, params=None)
+    def test_save_update(self):
+        update_object = self.mocks['update_object']
 
-    def test_save_update_with_qb(self):
-        with patch.object(self.qb_client, 'update_object') as update_object:
+        def check(qb, client):
             department = Department()
             department.Id = 1
             json = department.to_json()
 
-            department.save(qb=self.qb_client)
-            self.assertTrue(update_object.called)
+            department.save(qb=qb)
+            update_object.assert_called_once_with(client, "Department", json, request_id=None, params=None)
+
+        self.for_each_client(check, update_object)
+
 
+class DownloadPdfTest(MixinTestCase):
+    mocked_methods = ('download_pdf',)
 
-class DownloadPdfTest(QuickbooksUnitTestCase):
-    @patch('quickbooks.client.QuickBooks.download_pdf')
-    def test_download_invoice(self, download_pdf):
+    def test_download_invoice(self):
+        download_pdf = self.mocks['download_pdf']
         receipt = SalesReceipt()
         receipt.Id = "1"
 
         receipt.download_pdf(self.qb_client)
-        download_pdf.assert_called_once_with('SalesReceipt', "1")
+        download_pdf.assert_called_once_with(self.qb_client, 'SalesReceipt', "1")
 
     def test_download_missing_id(self):
-        from quickbooks.exceptions import QuickbooksException
-
         receipt = SalesReceipt()
         self.assertRaises(QuickbooksException, receipt.download_pdf)
 
@@ -287,8 +431,10 @@ class ObjectListTest(unittest.TestCase):
         for index in range(0, len(test_subclass_primitive_obj)):
             self.assertEqual(test_primitive_list[index], test_subclass_primitive_obj[index])
 
+        self.assertIn(2, test_subclass_primitive_obj)
+        members = set(test_subclass_primitive_obj[:])
         for prim in test_subclass_primitive_obj:
-            self.assertEqual(True, prim in test_subclass_primitive_obj)
+            self.assertIn(prim, members)
 
         self.assertEqual(3, test_subclass_primitive_obj.pop())
         test_subclass_primitive_obj.append(4)
@@ -302,9 +448,17 @@ class ObjectListTest(unittest.TestCase):
 
         self.assertEqual([4, 2], list(reversed(test_subclass_primitive_obj)))
 
+    def test_object_list_mixin_not_shared(self):
+        first = ObjectListMixin()
+        second = ObjectListMixin()
+        first.append(1)
+
+        self.assertEqual([1], first[:])
+        self.assertEqual([], second[:])
+
     def test_object_list_mixin_with_qb_objects(self):
 
-        pn1, pn2, pn3, pn4, pn5 = PhoneNumber(), PhoneNumber(), PhoneNumber(), PhoneNumber(), PhoneNumber()
+        pn1, pn2, pn3, pn4, pn5 = object(), object(), object(), object(), object()
         test_object_list = [pn1, pn2, pn3]
         test_subclass_object_obj = self.TestSubclass(test_object_list)
         self.assertEqual(test_object_list, test_subclass_object_obj[:])
@@ -312,8 +466,10 @@ class ObjectListTest(unittest.TestCase):
         for index in range (0, len(test_subclass_object_obj)):
             self.assertEqual(test_object_list[index], test_subclass_object_obj[index])
 
+        self.assertIn(pn2, test_subclass_object_obj)
+        member_ids = set(id(obj) for obj in test_subclass_object_obj[:])
         for obj in test_subclass_object_obj:
-            self.assertEqual(True, obj in test_subclass_object_obj)
+            self.assertIn(id(obj), member_ids)
 
         self.assertEqual(pn3, test_subclass_object_obj.pop())
         test_subclass_object_obj.append(pn4)
@@ -328,43 +484,43 @@ class ObjectListTest(unittest.TestCase):
         self.assertEqual([pn4, pn2], list(reversed(test_subclass_object_obj)))
 
 
-class DeleteMixinTest(QuickbooksUnitTestCase):
+class DeleteMixinTest(MixinTestCase):
     def test_delete_unsaved_exception(self):
-        from quickbooks.exceptions import QuickbooksException
-
         bill = Bill()
         self.assertRaises(QuickbooksException, bill.delete, qb=self.qb_client)
 
-    @patch('quickbooks.mixins.QuickBooks.delete_object')
-    def test_delete(self, delete_object):
+    def test_delete(self):
+        delete_object = swap(self, QuickBooks, 'delete_object', recorder())
         bill = Bill()
         bill.Id = 1
         bill.delete(qb=self.qb_client)
 
-        self.assertTrue(delete_object.called)
+        self.assertEqual(1, len(delete_object.calls))
 
 
-class DeleteNoIdMixinTest(QuickbooksUnitTestCase):
-    @patch('quickbooks.mixins.QuickBooks.delete_object')
-    def test_delete(self, delete_object):
+class DeleteNoIdMixinTest(MixinTestCase):
+    def test_delete(self):
+        delete_object = swap(self, QuickBooks, 'delete_object', recorder())
         recurring_txn = RecurringTransaction()
         recurring_txn.Bill = Bill()
         recurring_txn.delete(qb=self.qb_client)
 
-        self.assertTrue(delete_object.called)
+        self.assertEqual(1, len(delete_object.calls))
+
 
+class SendMixinTest(MixinTestCase):
+    mocked_methods = ('misc_operation',)
 
-class SendMixinTest(QuickbooksUnitTestCase):
-    @patch('quickbooks.mixins.QuickBooks.misc_operation')
-    def test_send(self, mock_misc_op):
+    def test_send(self):
+        mock_misc_op = self.mocks['misc_operation']
         invoice = Invoice()
         invoice.Id = 2
         invoice.send(qb=self.qb_client)
 
-        mock_misc_op.assert_called_with("invoice/2/send", None, 'application/octet-stream')
+        mock_misc_op.assert_called_with(self.qb_client, "invoice/2/send", None, 'application/octet-stream')
 
-    @patch('quickbooks.mixins.QuickBooks.misc_operation')
-    def test_send_with_send_to_email(self, mock_misc_op):
+    def test_send_with_send_to_email(self):
+        mock_misc_op = self.mocks['misc_operation']
         invoice = Invoice()
         invoice.Id = 2
         email = "test@email.com"
@@ -372,40 +528,40 @@ class SendMixinTest(QuickbooksUnitTestCase):
 
         invoice.send(qb=self.qb_client, send_to=email)
 
-        mock_misc_op.assert_called_with("invoice/2/send?sendTo={}".format(send_to_email), None, 'application/octet-stream')
+        mock_misc_op.assert_called_with(self.qb_client, "invoice/2/send?sendTo={}".format(send_to_email), None, 'application/octet-stream')
 
 
-class VoidMixinTest(QuickbooksUnitTestCase):
-    @patch('quickbooks.mixins.QuickBooks.post')
-    def test_void_invoice(self, post):
+class VoidMixinTest(MixinTestCase):
+    mocked_methods = ('post',)
+
+    def test_void_invoice(self):
+        post = self.mocks['post']
         invoice = Invoice()
         invoice.Id = 2
         invoice.void(qb=self.qb_client)
         self.assertTrue(post.called)
 
-    @patch('quickbooks.mixins.QuickBooks.post')
-    def test_void_payment(self, post):
+    def test_void_payment(self):
+        post = self.mocks['post']
         payment = Payment()
         payment.Id = 2
         payment.void(qb=self.qb_client)
         self.assertTrue(post.called)
 
-    @patch('quickbooks.mixins.QuickBooks.post')
-    def test_void_sales_receipt(self, post):
+    def test_void_sales_receipt(self):
+        post = self.mocks['post']
         sales_receipt = SalesReceipt()
         sales_receipt.Id = 2
         sales_receipt.void(qb=self.qb_client)
         self.assertTrue(post.called)
 
-    @patch('quickbooks.mixins.QuickBooks.post')
-    def test_void_bill_payment(self, post):
+    def test_void_bill_payment(self):
+        post = self.mocks['post']
         bill_payment = BillPayment()
         bill_payment.Id = 2
         bill_payment.void(qb=self.qb_client)
         self.assertTrue(post.called)
 
     def test_delete_unsaved_exception(self):
-        from quickbooks.exceptions import QuickbooksException
-
         invoice = Invoice()
         self.assertRaises(QuickbooksException, invoice.void, qb=self.qb_client)
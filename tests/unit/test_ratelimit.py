@@ -0,0 +1,29 @@
+import unittest
+from unittest.mock import patch
+
+from quickbooks import ratelimit
+
+
+class TokenBucketTests(unittest.TestCase):
+    def test_consume_with_tokens(self):
+        bucket = ratelimit.TokenBucket(2, 60)
+
+        self.assertEqual(bucket.consume(), 0)
+        self.assertEqual(bucket.consume(), 0)
+
+    @patch('quickbooks.ratelimit.time.sleep')
+    def test_consume_empty_bucket_waits(self, sleep):
+        bucket = ratelimit.TokenBucket(1, 60)
+        bucket.consume()
+
+        wait = bucket.consume()
+
+        self.assertTrue(0 < wait <= 60)
+        sleep.assert_called_once_with(wait)
+
+    def test_get_bucket_shared_per_key(self):
+        bucket = ratelimit.get_bucket("test_get_bucket", 500, 60)
+
+        self.assertIs(bucket, ratelimit.get_bucket("test_get_bucket", 500, 60))
+        self.assertIsNot(bucket, ratelimit.get_bucket("test_get_bucket_other", 500, 60))
+        self.assertIsNot(bucket, ratelimit.get_bucket("test_get_bucket", 100, 60))